@@ -1,6 +1,7 @@
 from collections import deque
 import dataclasses
 import enum
+import itertools
 import logging
 import random
 from typing import Union
@@ -243,15 +244,18 @@ class Simulation:
         *,
         seed: int = 0,
         arrival_rate: float = 1 / 6,
-        balking_strategy: BalkingStrategy = BalkingStrategy.DEFAULT_BALKING
+        balking_strategy: BalkingStrategy = BalkingStrategy.DEFAULT_BALKING,
+        simulation_stop_time: float = 60.0,
     ) -> None:
         self.time: float = 0.0
         """Minutes since 8:00:00 A.M."""
         self.random = random.Random(seed)
         self.arrival_rate = arrival_rate
         self.balking_strategy = balking_strategy
+        self.simulation_stop_time = simulation_stop_time
+        """No arrivals are generated after this time (minutes since 8:00:00 A.M.)"""
         self.elevator = Elevator()
-        self.arrival_queue = self.generate_arrival_queue()
+        self.arrival_queue = self.generate_arrival_queue(simulation_stop_time)
 
         # self.wont_balk: set[Person] = set()
         # """People who have made the decision that they won't ever balk."""
@@ -330,12 +334,13 @@ class Simulation:
             logging.debug(f"[handle_balking()] There's no balking. Returning, making no errors")
             return
         
-        people_in_queue = [
-            person
-            for person
-            in self.arrival_queue
-            if person.arrival_time <= self.time
-        ]
+        # The arrival queue is ordered by arrival time, so stop scanning at the
+        # first person who hasn't shown up yet. Scanning the whole queue makes
+        # long (steady-state) runs quadratic in the number of arrivals.
+        people_in_queue = list(itertools.takewhile(
+            lambda person: person.arrival_time <= self.time,
+            self.arrival_queue,
+        ))
         logging.debug(f"[handle_balking()] There are {len(people_in_queue)} people in queue at t={self.time}")
         if people_in_queue:
             logging.debug(f"[handle_balking()] Earliest arrival: {people_in_queue[0].arrival_time}")
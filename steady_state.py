@@ -0,0 +1,319 @@
+from bisect import bisect_left, bisect_right
+import dataclasses
+import math
+import statistics
+
+from simulation import Simulation, BalkingStrategy
+from evaluate_simulation import SimulationEvaluation
+
+
+@dataclasses.dataclass
+class ConfidenceInterval:
+    mean: float
+    half_width: float
+    confidence: float
+    batch_count: int
+
+    @property
+    def low(self) -> float:
+        return self.mean - self.half_width
+
+    @property
+    def high(self) -> float:
+        return self.mean + self.half_width
+
+    def __str__(self) -> str:
+        return (
+            f"{self.mean:.4f} ± {self.half_width:.4f} "
+            + f"({self.confidence:.0%} CI, {self.batch_count} batches)"
+        )
+
+
+MIN_BATCH_COUNT = 4
+"""Fewest batches `batch_means_interval()` accepts (see `t_quantile()`)"""
+
+MIN_MSER_BATCHES = 4
+"""Fewest MSER batch means `mser_truncation()` will try to truncate"""
+
+MAX_LAG1_AUTOCORRELATION = 0.5
+"""Largest lag-1 autocorrelation of the batch means `batch_means_interval()` accepts"""
+
+
+def t_quantile(probability: float, degrees_of_freedom: int) -> float:
+    """Quantile of Student's t distribution.
+
+    Uses the Cornish-Fisher expansion about the normal quantile
+    (Abramowitz & Stegun 26.7.5), without needing scipy. This is accurate to
+    about three decimal places from 3 degrees of freedom up, but badly
+    underestimates the tails below that (11.30 instead of 12.706 for the
+    97.5% quantile at 1 degree of freedom), so fewer are rejected."""
+    if degrees_of_freedom < MIN_BATCH_COUNT - 1:
+        raise ValueError(
+            f"Need at least {MIN_BATCH_COUNT - 1} degrees of freedom, got {degrees_of_freedom=}"
+        )
+    z = statistics.NormalDist().inv_cdf(probability)
+    v = degrees_of_freedom
+    g1 = (z**3 + z) / 4
+    g2 = (5 * z**5 + 16 * z**3 + 3 * z) / 96
+    g3 = (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384
+    g4 = (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / 92160
+    return z + g1 / v + g2 / v**2 + g3 / v**3 + g4 / v**4
+
+
+def batch(observations: list[float], batch_size: int) -> list[float]:
+    """Means of consecutive, non-overlapping batches of `batch_size` observations.
+
+    Any leftover observations at the end that don't fill a batch are dropped."""
+    return [
+        statistics.fmean(observations[start : start + batch_size])
+        for start
+        in range(0, len(observations) - batch_size + 1, batch_size)
+    ]
+
+
+def lag1_autocorrelation(values: list[float]) -> float:
+    """Sample lag-1 autocorrelation. A constant series has autocorrelation 0."""
+    mean = statistics.fmean(values)
+    deviations = [value - mean for value in values]
+    denominator = sum(deviation**2 for deviation in deviations)
+    if denominator == 0.0:
+        return 0.0
+    numerator = sum(
+        current * following
+        for current, following
+        in zip(deviations, deviations[1:])
+    )
+    return numerator / denominator
+
+
+def mser_truncation(observations: list[float], batch_size: int = 5) -> int:
+    """Number of initial observations to discard as warm-up, by MSER-5.
+
+    The observations are first averaged in batches of `batch_size`. The
+    truncation point is the number of leading batches `d` that minimizes
+    the marginal standard error statistic
+
+        sum((z_i - mean(z[d:]))**2 for z_i in z[d:]) / (n - d)**2
+
+    Only the first half of the run is searched: the statistic always falls
+    to 0 at the very end, so minima late in the run are meaningless. If the
+    statistic is still falling at the half-way point, the run never settled
+    down (it is too short, or the system has no steady state at all), and a
+    `ValueError` is raised rather than returning a truncation point.
+
+    Runs with fewer than `MIN_MSER_BATCHES` batch means are too short to
+    truncate, and aren't truncated at all."""
+    batch_means = batch(observations, batch_size)
+    n = len(batch_means)
+    if n < MIN_MSER_BATCHES:
+        return 0
+
+    # Work backwards so the running sums for z[d:] are O(1) to update
+    best_d = 0
+    best_statistic = math.inf
+    total = 0.0
+    total_squares = 0.0
+    statistics_by_d = [0.0] * n
+    for d in reversed(range(n)):
+        total += batch_means[d]
+        total_squares += batch_means[d] ** 2
+        remaining = n - d
+        sum_squared_deviations = total_squares - total**2 / remaining
+        statistics_by_d[d] = sum_squared_deviations / remaining**2
+
+    for d in range(n // 2 + 1):
+        if statistics_by_d[d] < best_statistic:
+            best_d = d
+            best_statistic = statistics_by_d[d]
+    if best_d >= n // 2:
+        raise ValueError(
+            f"MSER found no warm-up point in the first half of the run "
+            + f"({best_d * batch_size} of {len(observations)} observations). "
+            + f"The run is too short, or the system never reaches steady state"
+        )
+    return best_d * batch_size
+
+
+def batch_means_interval(
+    observations: list[float],
+    *,
+    batch_count: int = 20,
+    confidence: float = 0.95,
+    min_batch_size: int = 100,
+) -> ConfidenceInterval:
+    """Confidence interval for the steady-state mean, by the method of batch means.
+
+    The (already warm-up-truncated) observations are split into `batch_count`
+    equal batches. If the batches are long enough, their means are roughly
+    independent and normal, so a t interval on the batch means is valid even
+    though the individual observations are autocorrelated.
+
+    A `ValueError` is raised if there are fewer than `min_batch_size`
+    observations per batch, or if the lag-1 autocorrelation of the batch
+    means is above `MAX_LAG1_AUTOCORRELATION`, since in either case the
+    batches aren't long enough for the interval to mean anything."""
+    if batch_count < MIN_BATCH_COUNT:
+        raise ValueError(f"Need at least {MIN_BATCH_COUNT} batches, got {batch_count=}")
+    batch_size = len(observations) // batch_count
+    if batch_size < min_batch_size:
+        raise ValueError(
+            f"Not enough observations ({len(observations)}) for {batch_count} batches "
+            + f"of at least {min_batch_size}. Use a longer run"
+        )
+    batch_means = batch(observations, batch_size)[:batch_count]
+    autocorrelation = lag1_autocorrelation(batch_means)
+    if autocorrelation > MAX_LAG1_AUTOCORRELATION:
+        raise ValueError(
+            f"Batch means are too correlated to be treated as independent "
+            + f"(lag-1 autocorrelation {autocorrelation:.3f} > {MAX_LAG1_AUTOCORRELATION}). "
+            + f"Use a longer run"
+        )
+    mean = statistics.fmean(batch_means)
+    standard_error = statistics.stdev(batch_means) / math.sqrt(batch_count)
+    t = t_quantile(1 - (1 - confidence) / 2, batch_count - 1)
+    return ConfidenceInterval(
+        mean=mean,
+        half_width=t * standard_error,
+        confidence=confidence,
+        batch_count=batch_count,
+    )
+
+
+class SteadyStateEvaluation(SimulationEvaluation):
+    """Steady-state estimates from a single long run of a `Simulation`.
+
+    Instead of averaging thousands of independent 60-minute runs, run one
+    simulation with a large `simulation_stop_time`, drop the warm-up period
+    (found by MSER-5), and build batch-means confidence intervals from what's
+    left."""
+    def __init__(
+        self,
+        sim: Simulation,
+        *,
+        sample_interval: float = 1.0,
+        batch_count: int = 20,
+        confidence: float = 0.95,
+    ) -> None:
+        super().__init__(sim)
+        self.sample_interval = sample_interval
+        """Minutes between queue length samples"""
+        self.batch_count = batch_count
+        self.confidence = confidence
+
+    def wait_time_observations(self) -> list[float]:
+        """Elevator wait time of each elevator rider, in order of arrival"""
+        return [
+            person.elevator_load_time - person.arrival_time
+            for person
+            in self.sim.elevator_people()
+        ]
+
+    def queue_length_observations(self) -> list[float]:
+        """Queue length sampled every `sample_interval` minutes.
+
+        Matches `queue_length_at()`, but samples the whole run in
+        O(N log N) instead of O(N) per sample."""
+        arrival_times = sorted(person.arrival_time for person in self.sim.all_people)
+        left_queue_times = sorted(person.left_queue_time() for person in self.sim.all_people)
+        sample_count = int(self.sim.simulation_stop_time / self.sample_interval)
+        observations = []
+        for index in range(sample_count + 1):
+            time = index * self.sample_interval
+            # In the queue at `time` if arrival_time <= time <= left_queue_time
+            arrived = bisect_right(arrival_times, time)
+            left = bisect_left(left_queue_times, time)
+            observations.append(arrived - left)
+        return observations
+
+    def wait_time_warmup(self) -> int:
+        """Number of elevator riders to discard as warm-up"""
+        return mser_truncation(self.wait_time_observations())
+
+    def queue_length_warmup(self) -> float:
+        """Warm-up period for queue length, in minutes"""
+        return mser_truncation(self.queue_length_observations()) * self.sample_interval
+
+    def steady_state_wait_time(self) -> ConfidenceInterval:
+        observations = self.wait_time_observations()
+        warmup = mser_truncation(observations)
+        return batch_means_interval(
+            observations[warmup : ],
+            batch_count=self.batch_count,
+            confidence=self.confidence,
+        )
+
+    def steady_state_queue_length(self) -> ConfidenceInterval:
+        observations = self.queue_length_observations()
+        warmup = mser_truncation(observations)
+        return batch_means_interval(
+            observations[warmup : ],
+            batch_count=self.batch_count,
+            confidence=self.confidence,
+        )
+
+
+def self_check() -> None:
+    """Sanity checks for the statistics above, since the repo has no test suite"""
+    import random
+
+    assert batch([1, 2, 3, 4, 5, 6, 7], 2) == [1.5, 3.5, 5.5]
+
+    # Nothing to truncate from a constant series, or from one too short to judge
+    assert mser_truncation([3.0] * 500) == 0
+    assert mser_truncation([5, 1] * 5) == 0
+
+    # An obvious initial transient is removed, and not much more than that
+    rng = random.Random(0)
+    transient = [100.0 - 10 * index for index in range(10)]
+    steady = [rng.gauss(0, 1) for _ in range(990)]
+    warmup = mser_truncation(transient + steady)
+    assert 10 <= warmup <= 20, warmup
+
+    # A series that never settles down is rejected
+    try:
+        mser_truncation([float(index) for index in range(1000)])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("MSER accepted a trending series")
+
+    # Independent normal observations give an interval around the true mean
+    interval = batch_means_interval([rng.gauss(10, 2) for _ in range(10_000)])
+    assert interval.low < 10 < interval.high, interval
+    assert interval.batch_count == 20
+
+    # Too little data, too few batches, or correlated batch means are rejected
+    for observations, batch_count in [
+        ([rng.gauss(0, 1) for _ in range(500)], 20),
+        ([rng.gauss(0, 1) for _ in range(10_000)], 2),
+        ([float(index) for index in range(10_000)], 20),
+    ]:
+        try:
+            batch_means_interval(observations, batch_count=batch_count)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"Accepted {len(observations)=} {batch_count=}")
+
+    # Matches published t tables where the expansion is valid
+    assert abs(t_quantile(0.975, 3) - 3.182) < 0.01
+    assert abs(t_quantile(0.975, 19) - 2.093) < 0.001
+
+
+if __name__ == "__main__":
+    self_check()
+
+    RUN_LENGTH = 100_000.0
+
+    sim = Simulation(
+        seed=0,
+        balking_strategy=BalkingStrategy.DEFAULT_BALKING,
+        simulation_stop_time=RUN_LENGTH,
+    )
+    evaluation = SteadyStateEvaluation(sim)
+
+    print(f"Single run of {RUN_LENGTH:,.0f} minutes, {len(sim.all_people):,} arrivals")
+    print(f"Wait time warm-up:    {evaluation.wait_time_warmup():,} elevator riders")
+    print(f"Queue length warm-up: {evaluation.queue_length_warmup():,.1f} minutes")
+    print(f"Steady-state elevator wait time: {evaluation.steady_state_wait_time()}")
+    print(f"Steady-state queue length:       {evaluation.steady_state_queue_length()}")